@@ -0,0 +1,188 @@
+"""
+Shared Gemini client for the vision, LLM and TTS helpers.
+
+- One genai.Client backed by one pooled httpx.Client, so upstream calls
+  reuse keep-alive connections instead of paying a TLS handshake each.
+- API key resolved once: GEMINI_API_KEY, then GOOGLE_API_KEY.
+- Per-model defaults (model name + generation config) per call kind.
+- Lifecycle via shared_client(), entered from FastAPI's lifespan.
+- connection_stats() reports requests vs. new connections / TLS handshakes.
+
+Tuning (.env):
+    GEMINI_POOL_SIZE            max open connections        (default 20)
+    GEMINI_KEEPALIVE            max idle kept-alive conns   (default = pool size)
+    GEMINI_KEEPALIVE_EXPIRY     idle seconds before closing (default 60)
+    GEMINI_HTTP2                "0" to disable HTTP/2        (default on if h2 installed)
+    GEMINI_TIMEOUT              request timeout in seconds  (default 120)
+    GEMINI_BASE_URL             override endpoint, e.g. loadtest/fake_gemini.py
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from google import genai
+
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except Exception:  # pragma: no cover
+    HAS_HTTP2 = False
+
+load_dotenv()
+
+API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "20"))
+KEEPALIVE = int(os.getenv("GEMINI_KEEPALIVE", str(POOL_SIZE)))
+KEEPALIVE_EXPIRY = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "60"))
+HTTP2 = HAS_HTTP2 and os.getenv("GEMINI_HTTP2", "1") != "0"
+TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "120"))
+
+MODEL = os.getenv("GEMINI_MODEL")
+
+# kind -> model + generation config used unless the caller overrides it
+MODEL_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "vision": {
+        "model": os.getenv("GEMINI_VISION_MODEL") or MODEL or "gemini-2.5-flash",
+        "config": {"temperature": 0.1, "response_mime_type": "application/json"},
+    },
+    "text": {
+        "model": os.getenv("GEMINI_TEXT_MODEL") or MODEL or "gemini-2.0-flash",
+        "config": {"temperature": 0.2},
+    },
+    "tts": {
+        "model": os.getenv("GEMINI_TTS_MODEL", "gemini-2.5-flash-preview-tts"),
+        "config": {"response_modalities": ["AUDIO"]},
+    },
+}
+
+
+class _ConnectionStats:
+    """Counts requests against new connections via httpcore trace events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.connections = 0
+            self.tls_handshakes = 0
+            self.http2_requests = 0
+
+    def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+        elif event_name == "http2.send_request_headers.started":
+            with self._lock:
+                self.http2_requests += 1
+
+    def on_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                "requests": self.requests,
+                "new_connections": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reused_requests": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+                "http2_requests": self.http2_requests,
+            }
+
+
+_stats = _ConnectionStats()
+_lock = threading.Lock()
+_http: Optional[httpx.Client] = None
+_client: Optional[genai.Client] = None
+
+
+def _build_http() -> httpx.Client:
+    return httpx.Client(
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=POOL_SIZE,
+            max_keepalive_connections=KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(TIMEOUT, connect=10.0),
+        event_hooks={"request": [_stats.on_request]},
+    )
+
+
+def get_client() -> genai.Client:
+    """Return the shared client, creating it on first use."""
+    global _http, _client
+    if _client is not None:
+        return _client
+
+    with _lock:
+        if _client is None:
+            if not API_KEY:
+                raise ValueError("Missing GEMINI_API_KEY or GOOGLE_API_KEY in .env")
+            http_options: Dict[str, Any] = {}
+            if BASE_URL:
+                http_options["base_url"] = BASE_URL
+            # genai passes its own per-request timeout (None unless set),
+            # which overrides the httpx client default; value is in ms
+            http_options["timeout"] = int(TIMEOUT * 1000)
+            _http = _build_http()
+            http_options["httpx_client"] = _http
+            _client = genai.Client(api_key=API_KEY, http_options=http_options)
+    return _client
+
+
+def close_client():
+    global _http, _client
+    with _lock:
+        if _http is not None:
+            _http.close()
+        _http = None
+        _client = None
+
+
+@contextmanager
+def shared_client():
+    """Open the shared client for the duration of the block (app lifespan)."""
+    client = get_client()
+    try:
+        yield client
+    finally:
+        close_client()
+
+
+def generate_content(kind: str, contents: List[dict], **config: Any):
+    """generateContent with the per-kind model and config defaults applied."""
+    defaults = MODEL_DEFAULTS[kind]
+    merged = {**defaults["config"], **config}
+    return get_client().models.generate_content(
+        model=defaults["model"],
+        contents=contents,
+        config=merged or None,
+    )
+
+
+def connection_stats() -> Dict[str, Any]:
+    out = _stats.snapshot()
+    out.update({
+        "pool_size": POOL_SIZE,
+        "keepalive": KEEPALIVE,
+        "keepalive_expiry_s": KEEPALIVE_EXPIRY,
+        "http2": HTTP2,
+        "open": _client is not None,
+    })
+    return out
@@ -1,30 +1,18 @@
 """
 Gemini Vision extraction helper (google-genai SDK).
 
-- Client initialized once.
-- Model name read from .env (GEMINI_MODEL).
+- Uses the shared client from gemini_client.py.
+- Model name read from .env (GEMINI_VISION_MODEL / GEMINI_MODEL).
 - Always returns dict with:
     raw_text: str
     meds: list[str]
     explanation: optional str
 """
 
-import os
 import json
 from typing import Dict, Any, List, Optional
 
-from dotenv import load_dotenv
-from google import genai
-
-load_dotenv()
-
-API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-if not API_KEY:
-    raise ValueError("Missing GEMINI_API_KEY or GOOGLE_API_KEY in .env")
-
-MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-
-client = genai.Client(api_key=API_KEY)
+from gemini_client import generate_content
 
 PROMPT = """
 You are an assistant that extracts medication names from prescription images.
@@ -73,14 +61,7 @@ def gemini_extract_drugs_from_image(img_bytes: bytes) -> Dict[str, Any]:
         }
     ]
 
-    response = client.models.generate_content(
-        model=MODEL,
-        contents=contents,
-        config={
-            "temperature": 0.1,
-            "response_mime_type": "application/json",
-        },
-    )
+    response = generate_content("vision", contents)
 
     text = (getattr(response, "text", None) or "").strip()
     data = _safe_json_parse(text)
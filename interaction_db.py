@@ -1,9 +1,11 @@
 import csv
-from typing import List, Tuple, Dict
+from typing import Iterable, List, Tuple, Dict
 
 class InteractionDB:
     def __init__(self, csv_path="interactions_clean.csv"):
         self.rows = []
+        # drug -> other drug -> interaction texts, for O(1) pair lookups
+        self.adj: Dict[str, Dict[str, List[str]]] = {}
         try:
             with open(csv_path, newline='', encoding="utf-8") as f:
                 reader = csv.DictReader(f)
@@ -16,6 +18,18 @@ class InteractionDB:
         except Exception:
             self.rows = []
 
+        for row in self.rows:
+            a, b = row["drug1"], row["drug2"]
+            self.adj.setdefault(a, {}).setdefault(b, []).append(row["interaction"])
+            if a != b:
+                self.adj.setdefault(b, {}).setdefault(a, []).append(row["interaction"])
+
+    def _lookup(self, a: str, b: str) -> List[Dict]:
+        return [
+            {"drug_1": a, "drug_2": b, "interaction": text}
+            for text in self.adj.get(a, {}).get(b, [])
+        ]
+
     def check_list(self, meds: List[str]) -> Tuple[int, List[Dict]]:
         meds_clean = [m.lower().strip() for m in meds if m.strip()]
         found = []
@@ -23,16 +37,24 @@ class InteractionDB:
 
         for i in range(len(meds_clean)):
             for j in range(i+1, len(meds_clean)):
-                a = meds_clean[i]
-                b = meds_clean[j]
                 checked += 1
+                found.extend(self._lookup(meds_clean[i], meds_clean[j]))
+
+        return checked, found
 
-                for row in self.rows:
-                    if {row["drug1"], row["drug2"]} == {a, b}:
-                        found.append({
-                            "drug_1": a,
-                            "drug_2": b,
-                            "interaction": row["interaction"]
-                        })
+    def check_new(self, new_meds: List[str], existing: Iterable[str]) -> Tuple[int, List[Dict]]:
+        """
+        Incremental check: pairs within new_meds plus new x existing.
+        Pairs among the existing meds are assumed already checked.
+        """
+        checked, found = self.check_list(new_meds)
+        existing_clean = [m.lower().strip() for m in existing if m.strip()]
+
+        for a in (m.lower().strip() for m in new_meds if m.strip()):
+            neighbours = self.adj.get(a, {})
+            for b in existing_clean:
+                checked += 1
+                if b in neighbours:
+                    found.extend(self._lookup(a, b))
 
-        return checked, found
\ No newline at end of file
+        return checked, found
@@ -1,16 +1,6 @@
 # llm_gemini.py
 
-from google import genai
-import os
-import json
-from dotenv import load_dotenv
-
-load_dotenv()
-
-API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
-
-client = genai.Client(api_key=API_KEY)
+from gemini_client import generate_content
 
 def translate_explanation(text: str, lang: str) -> str:
     """
@@ -31,10 +21,8 @@ TEXT:
 {text}
 """
 
-    response = client.models.generate_content(
-        model=MODEL,
-        contents=[{"role": "user", "parts": [{"text": prompt}]}],
-        config={"temperature": 0.2}
+    response = generate_content(
+        "text", [{"role": "user", "parts": [{"text": prompt}]}]
     )
 
     return response.text.strip()
@@ -64,10 +52,8 @@ Rules:
 - Keep it general, max 8 sentences.
 """
 
-    response = client.models.generate_content(
-        model=MODEL,
-        contents=[{"role": "user", "parts": [{"text": prompt}]}],
-        config={"temperature": 0.2}
+    response = generate_content(
+        "text", [{"role": "user", "parts": [{"text": prompt}]}]
     )
 
     return response.text.strip()
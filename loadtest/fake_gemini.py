@@ -0,0 +1,211 @@
+"""
+Fake Gemini server for load tests.
+
+Speaks just enough of the generateContent REST API for gemini_vision.py,
+llm_gemini.py and tts_gemini.py to run against it when GEMINI_BASE_URL
+points here. Responses are canned; latency and error rate are injectable.
+
+Latency specs (seconds):
+    fixed:0.3
+    uniform:0.1,0.8
+    normal:0.4,0.1        (mean, stddev; clipped at 0)
+    lognormal:-1.0,0.5    (mu, sigma of the underlying normal)
+    exp:0.4               (mean)
+
+Usage:
+    python loadtest/fake_gemini.py --port 8090 --latency lognormal:-1,0.5 --error-rate 0.02
+"""
+
+import argparse
+import base64
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+MODEL_PATH = re.compile(r"/models/([^/:]+):generateContent")
+
+VISION_JSON = {
+    "raw_text": "Rx: Warfarin 5mg daily. Aspirin 81mg daily. Ibuprofen 200mg PRN.",
+    "meds": ["Warfarin", "Aspirin", "Ibuprofen"],
+}
+
+EXPLANATION_TEXT = (
+    "Warfarin is a blood thinner. Aspirin and ibuprofen can increase the "
+    "risk of bleeding when taken with it. Watch for unusual bruising."
+)
+
+# real Gemini TTS returns raw 16-bit mono PCM; 0.1s of silence
+AUDIO_MIME = "audio/L16;codec=pcm;rate=24000"
+AUDIO_BYTES = b"\x00\x00" * 2400
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    kind, _, args = spec.partition(":")
+    vals = [float(v) for v in args.split(",") if v.strip()]
+    kind = kind.strip().lower()
+
+    if kind == "fixed":
+        return lambda: vals[0]
+    if kind == "uniform":
+        return lambda: random.uniform(vals[0], vals[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(vals[0], vals[1]))
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(vals[0], vals[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1.0 / vals[0])
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def _has_inline_data(body: dict) -> bool:
+    for c in body.get("contents", []):
+        for p in c.get("parts", []):
+            if "inlineData" in p or "inline_data" in p:
+                return True
+    return False
+
+
+def _kind(model: str, body: dict) -> str:
+    modalities = body.get("generationConfig", {}).get("responseModalities", [])
+    if "tts" in model.lower() or "AUDIO" in modalities:
+        return "tts"
+    if _has_inline_data(body):
+        return "vision"
+    return "text"
+
+
+def _candidate(part: dict) -> dict:
+    return {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": [part]},
+                "finishReason": "STOP",
+                "index": 0,
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": 100,
+            "candidatesTokenCount": 50,
+            "totalTokenCount": 150,
+        },
+        "modelVersion": "fake",
+    }
+
+
+def canned_response(kind: str) -> dict:
+    if kind == "vision":
+        return _candidate({"text": json.dumps(VISION_JSON)})
+    if kind == "tts":
+        data = base64.b64encode(AUDIO_BYTES).decode()
+        return _candidate({"inlineData": {"mimeType": AUDIO_MIME, "data": data}})
+    return _candidate({"text": EXPLANATION_TEXT})
+
+
+def make_handler(
+    latency: Dict[str, Callable[[], float]], error_rate: float
+) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                return self._send(200, {"ok": True})
+            self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+
+            m = MODEL_PATH.search(self.path)
+            if not m:
+                return self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+            try:
+                body = json.loads(raw or b"{}")
+            except Exception:
+                return self._send(400, {"error": {"code": 400, "message": "Invalid JSON", "status": "INVALID_ARGUMENT"}})
+
+            kind = _kind(m.group(1), body)
+            time.sleep(latency[kind]())
+
+            if error_rate and random.random() < error_rate:
+                status = random.choice([429, 500, 503])
+                return self._send(status, {
+                    "error": {"code": status, "message": "Injected failure", "status": "UNAVAILABLE"}
+                })
+
+            self._send(200, canned_response(kind))
+
+    return Handler
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8090,
+    latency: str = "fixed:0.2",
+    vision_latency: Optional[str] = None,
+    text_latency: Optional[str] = None,
+    tts_latency: Optional[str] = None,
+    error_rate: float = 0.0,
+    seed: Optional[int] = None,
+):
+    if seed is not None:
+        random.seed(seed)
+
+    default = parse_latency(latency)
+    dists = {
+        "vision": parse_latency(vision_latency) if vision_latency else default,
+        "text": parse_latency(text_latency) if text_latency else default,
+        "tts": parse_latency(tts_latency) if tts_latency else default,
+    }
+
+    server = ThreadingHTTPServer((host, port), make_handler(dists, error_rate))
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fake Gemini generateContent server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8090)
+    ap.add_argument("--latency", default="fixed:0.2", help="default latency spec")
+    ap.add_argument("--vision-latency", help="latency spec for image extraction calls")
+    ap.add_argument("--text-latency", help="latency spec for explanation/translation calls")
+    ap.add_argument("--tts-latency", help="latency spec for TTS calls")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail (0-1)")
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args()
+
+    serve(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        vision_latency=args.vision_latency,
+        text_latency=args.text_latency,
+        tts_latency=args.tts_latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+End-to-end load test for the API against the fake Gemini server.
+
+Starts loadtest/fake_gemini.py and a uvicorn instance of main:app with
+GEMINI_BASE_URL pointed at the fake, then drives /ocr/check-image,
+/ocr/check-image/{lang} and /tts/{lang} at the requested concurrency.
+
+Reports per-route throughput and latency percentiles, plus CPU and
+memory of the uvicorn worker processes (via psutil, listed in
+requirements.txt; a warning is printed if it is missing).
+
+Usage (from the repo root):
+    python loadtest/run_load.py --concurrency 1,8,32 --requests 200 \\
+        --latency lognormal:-1,0.5 --error-rate 0.01 --workers 2
+
+Use --target http://host:port to hit an already-running app instead
+(the fake server and uvicorn are then not started).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+try:
+    import psutil
+except Exception:  # pragma: no cover
+    psutil = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_SERVER = os.path.join(ROOT, "loadtest", "fake_gemini.py")
+DEFAULT_IMAGE = os.path.join(ROOT, "CPP-Example-11-Safe.jpg")
+
+ROUTES = ["check-image", "check-image-lang", "tts"]
+
+
+# ---------- Process management ----------
+
+def wait_healthy(url: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def start_fake(args) -> subprocess.Popen:
+    cmd = [
+        sys.executable, FAKE_SERVER,
+        "--port", str(args.fake_port),
+        "--latency", args.latency,
+        "--error-rate", str(args.error_rate),
+    ]
+    for flag in ("vision_latency", "text_latency", "tts_latency", "seed"):
+        val = getattr(args, flag)
+        if val is not None:
+            cmd += ["--" + flag.replace("_", "-"), str(val)]
+    proc = subprocess.Popen(cmd)
+    try:
+        wait_healthy(f"http://127.0.0.1:{args.fake_port}/health")
+    except Exception:
+        stop(proc)
+        raise
+    return proc
+
+
+def start_app(args, profile_db: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{args.fake_port}",
+        "GEMINI_API_KEY": "fake-key",
+        "GOOGLE_API_KEY": "fake-key",
+        "MED_PROFILE_DB": profile_db,
+    })
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1",
+        "--port", str(args.port),
+        "--workers", str(args.workers),
+        "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    try:
+        wait_healthy(f"http://127.0.0.1:{args.port}/health")
+    except Exception:
+        stop(proc)
+        raise
+    return proc
+
+
+def stop(proc: Optional[subprocess.Popen]):
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ---------- Resource sampling ----------
+
+class ResourceSampler:
+    """Samples CPU% and RSS of a process and its children in a thread."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.interval = interval
+        self.cpu: List[float] = []
+        self.rss: List[int] = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._root = psutil.Process(pid) if psutil else None
+
+    def _procs(self):
+        procs = [self._root]
+        try:
+            procs += self._root.children(recursive=True)
+        except psutil.Error:
+            pass
+        return procs
+
+    def _run(self):
+        seen = {}
+        while not self._stop.is_set():
+            cpu = 0.0
+            rss = 0
+            for p in self._procs():
+                try:
+                    if p.pid not in seen:
+                        # first call primes the counter and returns 0.0
+                        p.cpu_percent(None)
+                        seen[p.pid] = p
+                    cpu += seen[p.pid].cpu_percent(None)
+                    rss += p.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.cpu.append(cpu)
+            self.rss.append(rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if self._root is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def summary(self) -> Dict:
+        if not self.cpu:
+            return {}
+        # skip the priming sample
+        cpu = self.cpu[1:] or self.cpu
+        return {
+            "cpu_percent_mean": round(sum(cpu) / len(cpu), 1),
+            "cpu_percent_max": round(max(cpu), 1),
+            "rss_mb_max": round(max(self.rss) / 1e6, 1),
+        }
+
+
+class _NullSampler:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def summary(self) -> Dict:
+        return {}
+
+
+# ---------- Load generation ----------
+
+def percentile(sorted_vals: List[float], pct: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, int(round(pct / 100 * len(sorted_vals))) - 1))
+    return sorted_vals[k]
+
+
+async def _call(client: httpx.AsyncClient, route: str, lang: str, image: bytes):
+    if route == "check-image":
+        files = {"file": ("rx.jpg", image, "image/jpeg")}
+        return await client.post("/ocr/check-image", files=files)
+    if route == "check-image-lang":
+        files = {"file": ("rx.jpg", image, "image/jpeg")}
+        return await client.post(f"/ocr/check-image/{lang}", files=files)
+    return await client.post(
+        f"/tts/{lang}", json={"text": "Warfarin is a blood thinner."}
+    )
+
+
+async def run_level(
+    base_url: str, routes: List[str], concurrency: int, total: int,
+    lang: str, image: bytes, timeout: float,
+) -> Dict:
+    results = {r: {"lat": [], "ok": 0, "err": 0, "status": {}} for r in routes}
+    counter = iter(range(total))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+
+        async def worker():
+            for i in counter:
+                route = routes[i % len(routes)]
+                res = results[route]
+                t0 = time.perf_counter()
+                try:
+                    resp = await _call(client, route, lang, image)
+                    status = str(resp.status_code)
+                    ok = resp.status_code < 400
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                    ok = False
+                res["lat"].append(time.perf_counter() - t0)
+                res["status"][status] = res["status"].get(status, 0) + 1
+                res["ok" if ok else "err"] += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    report = {"concurrency": concurrency, "elapsed_s": round(elapsed, 2), "routes": {}}
+    all_lat = []
+    for route, res in results.items():
+        lat = sorted(res["lat"])
+        all_lat += lat
+        report["routes"][route] = _stats(lat, res["ok"], res["err"], elapsed)
+        report["routes"][route]["status"] = res["status"]
+    ok = sum(r["ok"] for r in results.values())
+    err = sum(r["err"] for r in results.values())
+    report["total"] = _stats(sorted(all_lat), ok, err, elapsed)
+
+    # cumulative per-worker stats of the shared Gemini client, if exposed
+    try:
+        resp = httpx.get(base_url + "/gemini/stats", timeout=5.0)
+        if resp.status_code == 200:
+            report["gemini_connections"] = resp.json()
+    except httpx.HTTPError:
+        pass
+    return report
+
+
+def _stats(lat: List[float], ok: int, err: int, elapsed: float) -> Dict:
+    return {
+        "requests": ok + err,
+        "ok": ok,
+        "errors": err,
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(lat, 50) * 1000, 1),
+        "p90_ms": round(percentile(lat, 90) * 1000, 1),
+        "p95_ms": round(percentile(lat, 95) * 1000, 1),
+        "p99_ms": round(percentile(lat, 99) * 1000, 1),
+        "max_ms": round((lat[-1] if lat else 0.0) * 1000, 1),
+    }
+
+
+def print_report(report: Dict):
+    res = report.get("resources") or {}
+    print(f"\n== concurrency {report['concurrency']}  ({report['elapsed_s']}s)")
+    header = f"{'route':<18}{'reqs':>6}{'err':>6}{'rps':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    rows = list(report["routes"].items()) + [("TOTAL", report["total"])]
+    for name, s in rows:
+        print(
+            f"{name:<18}{s['requests']:>6}{s['errors']:>6}{s['throughput_rps']:>9}"
+            f"{s['p50_ms']:>9}{s['p90_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}"
+        )
+    if res:
+        print(
+            f"workers: cpu mean {res['cpu_percent_mean']}%  "
+            f"cpu max {res['cpu_percent_max']}%  rss max {res['rss_mb_max']} MB"
+        )
+    conns = report.get("gemini_connections")
+    if conns:
+        print(
+            f"gemini (one worker, cumulative): {conns['requests']} requests over "
+            f"{conns['new_connections']} connections, reuse {conns['reuse_ratio']:.0%}"
+        )
+
+
+# ---------- Entry point ----------
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test the Med API against a fake Gemini")
+    ap.add_argument("--concurrency", default="1,8,32", help="comma separated levels to sweep")
+    ap.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    ap.add_argument("--routes", default=",".join(ROUTES), help=f"subset of {ROUTES}")
+    ap.add_argument("--lang", default="vi")
+    ap.add_argument("--image", default=DEFAULT_IMAGE)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--port", type=int, default=8077)
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    ap.add_argument("--target", help="base URL of an already-running app")
+    ap.add_argument("--pid", type=int, help="app PID to sample when using --target")
+    ap.add_argument("--json", help="also write the full report to this path")
+
+    fake = ap.add_argument_group("fake Gemini")
+    fake.add_argument("--fake-port", type=int, default=8090)
+    fake.add_argument("--latency", default="fixed:0.2")
+    fake.add_argument("--vision-latency")
+    fake.add_argument("--text-latency")
+    fake.add_argument("--tts-latency")
+    fake.add_argument("--error-rate", type=float, default=0.0)
+    fake.add_argument("--seed", type=int)
+    args = ap.parse_args()
+
+    routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        ap.error(f"unknown routes: {sorted(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    with open(args.image, "rb") as f:
+        image = f.read()
+
+    if psutil is None:
+        print("psutil not installed; worker CPU/memory will not be reported", file=sys.stderr)
+
+    fake_proc = app_proc = None
+    profile_db = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    reports = []
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+            pid = args.pid
+        else:
+            fake_proc = start_fake(args)
+            app_proc = start_app(args, profile_db)
+            base_url = f"http://127.0.0.1:{args.port}"
+            pid = app_proc.pid
+
+        for level in levels:
+            with ResourceSampler(pid) if (psutil and pid) else _NullSampler() as sampler:
+                report = asyncio.run(run_level(
+                    base_url, routes, level, args.requests, args.lang, image, args.timeout
+                ))
+            report["resources"] = sampler.summary()
+            print_report(report)
+            reports.append(report)
+    finally:
+        stop(app_proc)
+        stop(fake_proc)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
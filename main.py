@@ -5,9 +5,12 @@ with DrugDB interaction checking + Gemini explanation + TTS.
 
 import io
 import os
+import asyncio
 import json
 import base64
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -16,10 +19,13 @@ from fastapi.responses import Response
 from PIL import Image
 from dotenv import load_dotenv
 
+from gemini_client import POOL_SIZE, shared_client, connection_stats
 from gemini_vision import gemini_extract_drugs_from_image
+from tiled_extract import extract_tiled
 from llm_gemini import generate_med_explanation, translate_explanation
 from drugs import DrugDB
 from interaction_db import InteractionDB
+from med_profile import MedProfileStore
 from tts_gemini import text_to_speech
 
 # Load env
@@ -28,8 +34,25 @@ load_dotenv()
 # Initialize DBs
 drugdb = DrugDB("drugs.csv")
 interactiondb = InteractionDB("interactions_clean.csv")
+profiles = MedProfileStore(os.getenv("MED_PROFILE_DB", "profiles.db"))
 
-app = FastAPI(title="Med Local API (Gemini Vision)", version="2.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one pooled Gemini client per worker, closed on shutdown.
+    # Blocking Gemini calls run via asyncio.to_thread, so size the default
+    # executor to the connection pool rather than the CPU-based default.
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="gemini")
+    loop.set_default_executor(executor)
+    try:
+        with shared_client():
+            yield
+    finally:
+        executor.shutdown(wait=False)
+
+
+app = FastAPI(title="Med Local API (Gemini Vision)", version="2.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,6 +71,22 @@ class CheckImageResponse(BaseModel):
     checked_pairs: int
     dangerous_combinations: List[dict]
     explanation: str
+    profile_meds: List[str] = []
+    # tiled mode: some tiles could not be read, meds may be missing
+    partial_extraction: bool = False
+
+class ProfileMedsRequest(BaseModel):
+    meds: List[str]
+
+class ProfileResponse(BaseModel):
+    patient_id: str
+    meds: List[str]
+    interactions: List[dict]
+
+class ProfileUpdateResponse(ProfileResponse):
+    new_meds: List[str]
+    checked_pairs: int
+    new_interactions: List[dict]
 
 class TTSRequest(BaseModel):
     text: str
@@ -82,6 +121,50 @@ def normalize_list(value) -> List[str]:
         return [p for p in parts if p]
     return [str(value).strip()]
 
+
+def check_upload(file: UploadFile):
+    ct = file.content_type or ""
+    if not (ct.startswith("image/") or ct == "application/pdf"):
+        raise HTTPException(status_code=400, detail="File must be an image or PDF")
+
+
+async def tiled_extraction(data: bytes, content_type: str):
+    try:
+        return await extract_tiled(data, drugdb, content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail=f"Extraction failed: {e}")
+
+
+def check_meds(
+    meds: List[str], patient_id: Optional[str] = None, persist: bool = True
+):
+    """
+    Without a patient: check all pairs within this scan.
+    With a patient: check only the new meds against what they already
+    take; interactions already cached for any scanned med are returned
+    alongside the new ones.
+    With persist (the default) the scan is added to the profile, misreads
+    included; callers remove wrong entries via
+    DELETE /profile/{patient_id}/meds/{med}. Without it the profile is
+    only read.
+    Returns (checked_pairs, interactions, profile_meds).
+    checked_pairs counts only the pairs checked for this scan.
+    """
+    if not patient_id:
+        checked_pairs, interactions = interactiondb.check_list(meds)
+        return checked_pairs, interactions, []
+
+    if not persist:
+        checked_pairs, interactions = profiles.check_meds(patient_id, meds, interactiondb)
+        return checked_pairs, interactions, profiles.get_meds(patient_id)
+
+    _, checked_pairs, _ = profiles.add_meds(patient_id, meds, interactiondb)
+    # new interactions are already stored, so this covers both
+    interactions = profiles.get_interactions(patient_id, meds)
+    return checked_pairs, interactions, profiles.get_meds(patient_id)
+
 # ---------- Routes ----------
 
 @app.get("/health")
@@ -89,22 +172,42 @@ def health():
     return {"ok": True}
 
 
-@app.post("/ocr/check-image", response_model=CheckImageResponse)
-async def ocr_check_image_route(file: UploadFile = File(...)):
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
+@app.get("/gemini/stats")
+def gemini_stats():
+    return connection_stats()
 
+
+@app.post("/ocr/check-image", response_model=CheckImageResponse)
+async def ocr_check_image_route(
+    file: UploadFile = File(...),
+    patient_id: Optional[str] = None,
+    tiled: bool = False,
+    persist: bool = True,
+):
+    check_upload(file)
     img_bytes = await file.read()
-    img_small = compress_image(img_bytes)
 
-    g = gemini_extract_drugs_from_image(img_small)
+    # PDFs and large sheets: per-page overlapping tiles, extracted in parallel
+    if tiled or file.content_type == "application/pdf":
+        g = await tiled_extraction(img_bytes, file.content_type)
+    else:
+        img_small = await asyncio.to_thread(compress_image, img_bytes)
+        g = await asyncio.to_thread(gemini_extract_drugs_from_image, img_small)
     raw_text = g.get("raw_text", "")
     gemini_meds = normalize_list(g.get("meds", []))
 
     normalized_meds = drugdb.normalize_many(gemini_meds)
-    checked_pairs, interactions = interactiondb.check_list(normalized_meds)
+    checked_pairs, interactions, profile_meds = await asyncio.to_thread(
+        check_meds, normalized_meds, patient_id,
+        # an incomplete tiled read should not shape the stored profile
+        persist and not g.get("partial", False),
+    )
 
-    explanation = generate_med_explanation(normalized_meds, interactions)
+    # interactions may name profile drugs that were not in this scan
+    explain_meds = drugdb.normalize_many(normalized_meds + profile_meds)
+    explanation = await asyncio.to_thread(
+        generate_med_explanation, explain_meds, interactions
+    )
 
     return CheckImageResponse(
         raw_text=raw_text,
@@ -112,32 +215,49 @@ async def ocr_check_image_route(file: UploadFile = File(...)):
         candidate_meds=normalized_meds,
         checked_pairs=checked_pairs,
         dangerous_combinations=interactions,
-        explanation=explanation
+        explanation=explanation,
+        profile_meds=profile_meds,
+        partial_extraction=g.get("partial", False),
     )
 
 
 @app.post("/ocr/check-image/{lang}")
-async def ocr_check_image_lang(lang: str, file: UploadFile = File(...)):
+async def ocr_check_image_lang(
+    lang: str,
+    file: UploadFile = File(...),
+    patient_id: Optional[str] = None,
+    tiled: bool = False,
+    persist: bool = True,
+):
     lang = lang.lower().strip() or "en"
 
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
-
+    check_upload(file)
     img_bytes = await file.read()
 
-    g = gemini_extract_drugs_from_image(img_bytes)
+    if tiled or file.content_type == "application/pdf":
+        g = await tiled_extraction(img_bytes, file.content_type)
+    else:
+        g = await asyncio.to_thread(gemini_extract_drugs_from_image, img_bytes)
     meds = g.get("meds", [])
     raw_text = g.get("raw_text", "")
 
     # ❗ FIXED: use correct variable names
     normalized_meds = drugdb.normalize_many(meds)
-    checked_pairs, interactions = interactiondb.check_list(normalized_meds)
+    checked_pairs, interactions, profile_meds = await asyncio.to_thread(
+        check_meds, normalized_meds, patient_id,
+        persist and not g.get("partial", False),
+    )
 
-    explanation_en = generate_med_explanation(normalized_meds, interactions)
+    explain_meds = drugdb.normalize_many(normalized_meds + profile_meds)
+    explanation_en = await asyncio.to_thread(
+        generate_med_explanation, explain_meds, interactions
+    )
 
     if lang != "en":
-        explanation = translate_explanation(explanation_en, lang)
-        raw_text_translated = translate_explanation(raw_text, lang)
+        explanation, raw_text_translated = await asyncio.gather(
+            asyncio.to_thread(translate_explanation, explanation_en, lang),
+            asyncio.to_thread(translate_explanation, raw_text, lang),
+        )
     else:
         explanation = explanation_en
         raw_text_translated = raw_text
@@ -152,15 +272,55 @@ async def ocr_check_image_lang(lang: str, file: UploadFile = File(...)):
         "checked_pairs": checked_pairs,
         "dangerous_combinations": interactions,
         "explanation": explanation,
+        "profile_meds": profile_meds,
+        "partial_extraction": g.get("partial", False),
         # "audio_base64": base64.b64encode(audio).decode()
     }
 
 
+@app.get("/profile/{patient_id}", response_model=ProfileResponse)
+def get_profile(patient_id: str):
+    return ProfileResponse(
+        patient_id=patient_id,
+        meds=profiles.get_meds(patient_id),
+        interactions=profiles.get_interactions(patient_id),
+    )
+
+
+@app.post("/profile/{patient_id}/meds", response_model=ProfileUpdateResponse)
+def add_profile_meds(patient_id: str, req: ProfileMedsRequest):
+    meds = drugdb.normalize_many(normalize_list(req.meds))
+    new_meds, checked_pairs, new_interactions = profiles.add_meds(
+        patient_id, meds, interactiondb
+    )
+    return ProfileUpdateResponse(
+        patient_id=patient_id,
+        meds=profiles.get_meds(patient_id),
+        interactions=profiles.get_interactions(patient_id),
+        new_meds=new_meds,
+        checked_pairs=checked_pairs,
+        new_interactions=new_interactions,
+    )
+
+
+@app.delete("/profile/{patient_id}/meds/{med}", response_model=ProfileResponse)
+def remove_profile_med(patient_id: str, med: str):
+    if not profiles.remove_med(patient_id, drugdb.normalize(med)):
+        raise HTTPException(status_code=404, detail=f"{med} not in profile")
+    return get_profile(patient_id)
+
+
+@app.delete("/profile/{patient_id}")
+def clear_profile(patient_id: str):
+    profiles.clear(patient_id)
+    return {"ok": True}
+
+
 @app.post("/tts/{lang}")
 async def generate_audio(lang: str, req: TTSRequest):
     try:
-        audio_bytes = text_to_speech(req.text, lang)
+        audio_bytes = await asyncio.to_thread(text_to_speech, req.text, lang)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TTS error: {e}")
 
-    return Response(content=audio_bytes, media_type="audio/mpeg")
+    return Response(content=audio_bytes, media_type="audio/wav")
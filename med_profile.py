@@ -0,0 +1,161 @@
+"""
+MedProfileStore
+Persists each patient's current medication list in a local SQLite file,
+together with the interactions already found among those meds.
+
+New scans are checked incrementally: only the newly added meds are
+paired against the stored list (O(new x existing)), and previously
+found interactions are served from the cache instead of re-checked.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
+
+from interaction_db import InteractionDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile_meds (
+    patient_id TEXT NOT NULL,
+    med_key    TEXT NOT NULL,
+    med_name   TEXT NOT NULL,
+    added_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (patient_id, med_key)
+);
+CREATE TABLE IF NOT EXISTS profile_interactions (
+    patient_id  TEXT NOT NULL,
+    drug_1      TEXT NOT NULL,
+    drug_2      TEXT NOT NULL,
+    interaction TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_profile_interactions_patient
+    ON profile_interactions (patient_id);
+"""
+
+
+class MedProfileStore:
+    def __init__(self, db_path: str = "profiles.db"):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # one short-lived connection per call keeps this safe across threads
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_meds(self, patient_id: str) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT med_name FROM profile_meds WHERE patient_id = ? ORDER BY added_at, rowid",
+                (patient_id,),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def get_interactions(
+        self, patient_id: str, meds: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Cached interactions for the patient. With meds, only those
+        involving at least one of them.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT drug_1, drug_2, interaction FROM profile_interactions "
+                "WHERE patient_id = ? ORDER BY rowid",
+                (patient_id,),
+            ).fetchall()
+        if meds is not None:
+            keys = {m.lower().strip() for m in meds}
+            rows = [r for r in rows if r[0] in keys or r[1] in keys]
+        return [{"drug_1": a, "drug_2": b, "interaction": i} for a, b, i in rows]
+
+    def add_meds(
+        self, patient_id: str, meds: List[str], interactiondb: InteractionDB
+    ) -> Tuple[List[str], int, List[Dict]]:
+        """
+        Add meds to the profile, checking only the ones not already stored.
+        Returns (new_meds, checked_pairs, new_interactions).
+        """
+        with self._connect() as conn:
+            # take the write lock up front so concurrent scans for the
+            # same patient cannot both see the med as new
+            conn.execute("BEGIN IMMEDIATE")
+            existing = [
+                r[0] for r in conn.execute(
+                    "SELECT med_key FROM profile_meds WHERE patient_id = ?",
+                    (patient_id,),
+                )
+            ]
+            known = set(existing)
+
+            new_meds = []
+            for m in meds:
+                key = m.lower().strip()
+                if key and key not in known:
+                    known.add(key)
+                    new_meds.append(m.strip())
+
+            checked, found = interactiondb.check_new(new_meds, existing)
+
+            conn.executemany(
+                "INSERT INTO profile_meds (patient_id, med_key, med_name) VALUES (?, ?, ?)",
+                [(patient_id, m.lower(), m) for m in new_meds],
+            )
+            conn.executemany(
+                "INSERT INTO profile_interactions (patient_id, drug_1, drug_2, interaction) "
+                "VALUES (?, ?, ?, ?)",
+                [(patient_id, f["drug_1"], f["drug_2"], f["interaction"]) for f in found],
+            )
+
+        return new_meds, checked, found
+
+    def check_meds(
+        self, patient_id: str, meds: List[str], interactiondb: InteractionDB
+    ) -> Tuple[int, List[Dict]]:
+        """
+        Read-only counterpart of add_meds: checks meds not yet in the
+        profile against it without storing anything.
+        Returns (checked_pairs, interactions), cached ones included.
+        """
+        with self._connect() as conn:
+            existing = [
+                r[0] for r in conn.execute(
+                    "SELECT med_key FROM profile_meds WHERE patient_id = ?",
+                    (patient_id,),
+                )
+            ]
+        known = set(existing)
+        new_meds = []
+        for m in meds:
+            key = m.lower().strip()
+            if key and key not in known:
+                known.add(key)
+                new_meds.append(m.strip())
+
+        checked, found = interactiondb.check_new(new_meds, existing)
+        return checked, self.get_interactions(patient_id, meds) + found
+
+    def remove_med(self, patient_id: str, med: str) -> bool:
+        key = med.lower().strip()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM profile_meds WHERE patient_id = ? AND med_key = ?",
+                (patient_id, key),
+            )
+            conn.execute(
+                "DELETE FROM profile_interactions "
+                "WHERE patient_id = ? AND (drug_1 = ? OR drug_2 = ?)",
+                (patient_id, key, key),
+            )
+        return cur.rowcount > 0
+
+    def clear(self, patient_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM profile_meds WHERE patient_id = ?", (patient_id,))
+            conn.execute("DELETE FROM profile_interactions WHERE patient_id = ?", (patient_id,))
@@ -0,0 +1,187 @@
+"""
+Tiled extraction for multi-page PDFs and very large prescription images.
+
+- Pages are rasterized locally (PDF via PyMuPDF, images via Pillow,
+  including multi-frame TIFFs).
+- Pages larger than TILE_SIZE (+ TILE_OVERLAP slack) are split into
+  evenly spaced overlapping tiles, so each tile reaches Gemini at full
+  resolution instead of being shrunk.
+- Tiles go to gemini_extract_drugs_from_image concurrently, capped at
+  TILE_CONCURRENCY (default GEMINI_POOL_SIZE). While tiles <= cap, latency
+  is that of the slowest tile; beyond it tiles run in ceil(tiles / cap)
+  waves. Raising the cap past the pool size only queues on connections,
+  and a high cap lets one large document use up more of the rate limit.
+- A failed tile is retried once; if it still fails the rest are merged
+  and the result is flagged partial. Only if every tile fails is it raised.
+- Meds are merged and deduplicated via DrugDB.normalize_many.
+
+Returns the same dict shape as gemini_extract_drugs_from_image, plus
+page, tile and failed-tile counts and a partial flag.
+"""
+
+import io
+import os
+import math
+import asyncio
+from typing import Dict, Any, List, Tuple
+
+from PIL import Image, ImageSequence
+
+from drugs import DrugDB
+from gemini_client import POOL_SIZE
+from gemini_vision import gemini_extract_drugs_from_image
+
+try:
+    import fitz  # PyMuPDF
+except Exception:  # pragma: no cover
+    fitz = None
+
+TILE_SIZE = int(os.getenv("TILE_SIZE", "1600"))
+TILE_OVERLAP = int(os.getenv("TILE_OVERLAP", "200"))
+TILE_CONCURRENCY = int(os.getenv("TILE_CONCURRENCY", str(POOL_SIZE)))
+PDF_DPI = int(os.getenv("PDF_DPI", "200"))
+MAX_PAGES = int(os.getenv("MAX_PAGES", "20"))
+
+if not 0 <= TILE_OVERLAP < TILE_SIZE:
+    raise ValueError(
+        f"TILE_OVERLAP ({TILE_OVERLAP}) must be >= 0 and smaller than TILE_SIZE ({TILE_SIZE})"
+    )
+
+
+def is_pdf(data: bytes, content_type: str = "") -> bool:
+    return content_type == "application/pdf" or data[:5] == b"%PDF-"
+
+
+def rasterize_pages(data: bytes, content_type: str = "") -> List[Image.Image]:
+    if is_pdf(data, content_type):
+        if fitz is None:
+            raise ValueError("PDF support requires PyMuPDF (pip install pymupdf)")
+        pages = []
+        try:
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                page_count = doc.page_count
+                if page_count <= MAX_PAGES:
+                    for page in doc:
+                        pix = page.get_pixmap(dpi=PDF_DPI)
+                        pages.append(Image.frombytes("RGB", (pix.width, pix.height), pix.samples))
+        except Exception as e:
+            # PyMuPDF's FileDataError/EmptyFileError are RuntimeErrors;
+            # keep them client errors rather than upstream failures
+            raise ValueError(f"Invalid PDF: {e}")
+        if page_count > MAX_PAGES:
+            raise ValueError(f"PDF has {page_count} pages, max is {MAX_PAGES}")
+        return pages
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        frames = [f.convert("RGB") for f in ImageSequence.Iterator(img)]
+    except Exception as e:
+        raise ValueError(f"Invalid image: {e}")
+    if len(frames) > MAX_PAGES:
+        raise ValueError(f"Image has {len(frames)} frames, max is {MAX_PAGES}")
+    return frames
+
+
+def _spans(length: int, size: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Evenly spaced (start, end) spans covering length, each sharing
+    `overlap` pixels with its neighbour. An axis up to size + overlap
+    stays a single span rather than gaining a near-duplicate tile.
+    """
+    if length <= size + overlap:
+        return [(0, length)]
+    n = math.ceil((length - overlap) / (size - overlap))
+    span = math.ceil((length + (n - 1) * overlap) / n)
+    step = span - overlap
+    return [(i * step, min(i * step + span, length)) for i in range(n)]
+
+
+def split_tiles(
+    img: Image.Image, size: int = TILE_SIZE, overlap: int = TILE_OVERLAP
+) -> List[Image.Image]:
+    w, h = img.size
+    return [
+        img.crop((x0, y0, x1, y1))
+        for y0, y1 in _spans(h, size, overlap)
+        for x0, x1 in _spans(w, size, overlap)
+    ]
+
+
+def encode_tile(img: Image.Image, quality: int = 70) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def _prepare(data: bytes, content_type: str) -> List[List[bytes]]:
+    """Rasterize + tile + encode; returns encoded tiles grouped by page."""
+    return [
+        [encode_tile(t) for t in split_tiles(page)]
+        for page in rasterize_pages(data, content_type)
+    ]
+
+
+def _merge_text(texts: List[str]) -> str:
+    # overlapping tiles repeat lines at their seams, so drop lines already
+    # seen in an earlier tile; repeats within one tile are real and kept
+    seen = set()
+    lines = []
+    for text in texts:
+        tile_keys = set()
+        for line in text.splitlines():
+            key = line.strip().lower()
+            if key and key not in seen:
+                tile_keys.add(key)
+                lines.append(line.strip())
+        seen |= tile_keys
+    return "\n".join(lines)
+
+
+async def extract_tiled(
+    data: bytes,
+    drugdb: DrugDB,
+    content_type: str = "",
+    max_concurrency: int = TILE_CONCURRENCY,
+) -> Dict[str, Any]:
+    pages = await asyncio.to_thread(_prepare, data, content_type)
+    sem = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(tile: bytes) -> Dict[str, Any]:
+        async with sem:
+            try:
+                return await asyncio.to_thread(gemini_extract_drugs_from_image, tile)
+            except Exception:
+                # one retry covers the usual transient 429/5xx
+                return await asyncio.to_thread(gemini_extract_drugs_from_image, tile)
+
+    results = await asyncio.gather(
+        *(run(t) for tiles in pages for t in tiles), return_exceptions=True
+    )
+
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if results and len(failures) == len(results):
+        raise RuntimeError(f"All {len(results)} tiles failed: {failures[0]}") from failures[0]
+
+    raw_parts = []
+    meds = []
+    i = 0
+    for n, tiles in enumerate(pages, start=1):
+        page_results = [
+            r for r in results[i:i + len(tiles)] if not isinstance(r, BaseException)
+        ]
+        i += len(tiles)
+        text = _merge_text([r.get("raw_text", "") for r in page_results])
+        if len(pages) > 1:
+            text = f"--- page {n} ---\n{text}"
+        raw_parts.append(text)
+        for r in page_results:
+            meds.extend(r.get("meds", []))
+
+    return {
+        "raw_text": "\n".join(raw_parts),
+        "meds": drugdb.normalize_many(meds),
+        "pages": len(pages),
+        "tiles": len(results),
+        "failed_tiles": len(failures),
+        "partial": bool(failures),
+    }
@@ -1,44 +1,45 @@
-import base64
-from google import genai
-from dotenv import load_dotenv
+import io
 import os
+import re
+import wave
 
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+from gemini_client import generate_content
+
+VOICE = os.getenv("GEMINI_TTS_VOICE", "Kore")
+
+def _pcm_to_wav(pcm: bytes, rate: int = 24000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)  # 16-bit
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    return buf.getvalue()
 
-client = genai.Client(api_key=API_KEY)
 
 def text_to_speech(text: str, lang: str = "en") -> bytes:
     """
-    Working TTS for google-genai >= 1.50.0
-    Uses content parts for both text + audio config
+    Gemini TTS via response_modalities=AUDIO + speech_config.
+    The language is inferred from the text itself.
+    Gemini returns raw 16-bit PCM; it is wrapped as WAV here.
     """
 
-    voice = "en-US-Neural2-F"
-
-    response = client.models.generate_content(
-        model="gemini-tts-1",
-        contents=[
-            {
-                "role": "user",
-                "parts": [
-                    {"text": text},
-                    {
-                        "voiceConfig": {"voiceName": voice},
-                    },
-                    {
-                        "audioConfig": {
-                            "audioEncoding": "MP3"
-                        }
-                    }
-                ]
-            }
-        ]
+    response = generate_content(
+        "tts",
+        [{"role": "user", "parts": [{"text": text}]}],
+        speech_config={
+            "voice_config": {"prebuilt_voice_config": {"voice_name": VOICE}}
+        },
     )
 
-    # Extract audio data
+    # Extract audio data (inline_data.data is already decoded bytes)
     for part in response.candidates[0].content.parts:
-        if hasattr(part, "audio") and hasattr(part.audio, "data"):
-            return base64.b64decode(part.audio.data)
+        blob = getattr(part, "inline_data", None)
+        if blob is not None and blob.data:
+            mime = (blob.mime_type or "").lower()
+            if mime.startswith("audio/l16") or mime.startswith("audio/pcm"):
+                m = re.search(r"rate=(\d+)", mime)
+                return _pcm_to_wav(blob.data, int(m.group(1)) if m else 24000)
+            return blob.data
 
-    raise RuntimeError("Gemini TTS returned no audio data")
\ No newline at end of file
+    raise RuntimeError("Gemini TTS returned no audio data")